@@ -22,7 +22,9 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    # connect=False defers sockets and monitor threads to first use, so a
+    # preloaded app can fork server workers safely
+    _client = MongoClient(database_url, connect=False)
     db = _client[database_name]
 
 # Helper functions for common database operations
@@ -43,12 +45,28 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     result = db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, sort: list = None, stages: list = None):
+    """Get documents from collection, optionally projected and sorted.
+
+    When extra aggregation stages are given (e.g. to reshape documents
+    server-side), the query runs as an aggregation pipeline with them appended.
+    """
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    if stages:
+        pipeline = [{"$match": filter_dict or {}}]
+        if sort:
+            pipeline.append({"$sort": dict(sort)})
+        if limit:
+            pipeline.append({"$limit": limit})
+        if projection:
+            pipeline.append({"$project": projection})
+        return list(db[collection_name].aggregate(pipeline + list(stages)))
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
     if limit:
         cursor = cursor.limit(limit)
     
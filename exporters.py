@@ -0,0 +1,106 @@
+"""
+Export Renderers
+
+CPU-bound document builders for project exports. Kept free of app imports so
+they can run in a process pool without loading the API, database or HTTP client.
+Each renderer takes {"title": str, "outputs": outputs[lang][section]} (regrouped
+from the stored section-major shape) and returns bytes.
+"""
+
+import io
+import os
+from xml.sax.saxutils import escape
+
+# reportlab's built-in Helvetica has no glyphs for Polish letters (ł, ż, ś, ...),
+# so PDFs are set in a Unicode TTF. Override with PDF_FONT_PATH / PDF_BOLD_FONT_PATH.
+PDF_FONT = "ExportSans"
+PDF_BOLD_FONT = "ExportSans-Bold"
+FONT_DIRS = [
+    "/usr/share/fonts/truetype/dejavu",  # Debian/Ubuntu (fonts-dejavu-core)
+    "/usr/share/fonts/dejavu",  # Fedora, Alpine
+    "/usr/share/fonts/TTF",  # Arch
+]
+
+# Every character the Polish templates can emit must be covered by the font
+POLISH_SAMPLE = "ąćęłńóśźżĄĆĘŁŃÓŚŹŻ"
+
+
+def _find_font(env_var: str, filename: str) -> str:
+    path = os.getenv(env_var)
+    if path:
+        return path
+    for directory in FONT_DIRS:
+        candidate = os.path.join(directory, filename)
+        if os.path.exists(candidate):
+            return candidate
+    raise RuntimeError(f"No Unicode font for PDF export: install DejaVu fonts or set {env_var}")
+
+
+def register_pdf_fonts() -> None:
+    """Register the Unicode export fonts with reportlab once per process."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if PDF_FONT in pdfmetrics.getRegisteredFontNames():
+        return
+    regular = TTFont(PDF_FONT, _find_font("PDF_FONT_PATH", "DejaVuSans.ttf"))
+    bold = TTFont(PDF_BOLD_FONT, _find_font("PDF_BOLD_FONT_PATH", "DejaVuSans-Bold.ttf"))
+    for font in (regular, bold):
+        missing = [ch for ch in POLISH_SAMPLE if ord(ch) not in font.face.charToGlyph]
+        if missing:
+            raise RuntimeError(f"PDF font {font.face.filename} lacks glyphs for: {''.join(missing)}")
+        pdfmetrics.registerFont(font)
+    pdfmetrics.registerFontFamily(PDF_FONT, normal=PDF_FONT, bold=PDF_BOLD_FONT, italic=PDF_FONT, boldItalic=PDF_BOLD_FONT)
+
+
+def render_pdf(doc: dict) -> bytes:
+    """Render the project outputs as a simple paginated PDF."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    register_pdf_fonts()
+    styles = getSampleStyleSheet()
+    styles["Title"].fontName = PDF_BOLD_FONT
+    styles["Heading1"].fontName = PDF_BOLD_FONT
+    styles["Heading2"].fontName = PDF_BOLD_FONT
+    styles["BodyText"].fontName = PDF_FONT
+    story = [Paragraph(escape(doc.get("title") or ""), styles["Title"])]
+    for lang, sections in (doc.get("outputs") or {}).items():
+        story.append(Paragraph(escape(lang.upper()), styles["Heading1"]))
+        for sec, val in sections.items():
+            story.append(Paragraph(escape(sec), styles["Heading2"]))
+            # Paragraph takes mini-markup: escape the text and keep line breaks
+            story.append(Paragraph(escape(val or "").replace("\n", "<br/>"), styles["BodyText"]))
+            story.append(Spacer(1, 6))
+
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4, title=doc.get("title") or "", initialFontName=PDF_FONT).build(story)
+    return buf.getvalue()
+
+
+def render_docx(doc: dict) -> bytes:
+    """Render the project outputs as a Word document."""
+    from docx import Document
+
+    document = Document()
+    document.add_heading(doc.get("title") or "", level=0)
+    for lang, sections in (doc.get("outputs") or {}).items():
+        document.add_heading(lang.upper(), level=1)
+        for sec, val in sections.items():
+            document.add_heading(sec, level=2)
+            document.add_paragraph(val or "")
+
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+def warm_up() -> None:
+    """Import the rendering libraries and load the PDF fonts ahead of the first export.
+
+    Also fails worker startup early if no font covering Polish is available.
+    """
+    import docx  # noqa: F401
+    import reportlab.platypus  # noqa: F401
+    register_pdf_fonts()
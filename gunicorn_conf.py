@@ -0,0 +1,21 @@
+"""
+Gunicorn configuration for production
+
+Runs one uvicorn worker process per CPU core so CPU-bound work in one worker
+does not stall the others. The app is preloaded in the master so workers share
+imported modules copy-on-write; per-worker resources (HTTP client, export pool)
+are created in the app's startup handlers after the fork.
+
+    gunicorn -c gunicorn_conf.py main:app
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Let the app size its per-worker pools against the real worker count
+os.environ["WEB_CONCURRENCY"] = str(workers)
@@ -1,23 +1,93 @@
 import os
-import io
+import copy
+import hashlib
+import threading
 import uuid
-from datetime import datetime
+import asyncio
+import logging
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from datetime import datetime, timezone
 from typing import List, Optional, Dict
 
-import requests
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import aiofiles
+import blake3
+from cachetools import TTLCache, cached
+import gridfs
+import httpx
+import orjson
+from bson import ObjectId
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from database import db, create_document, get_documents
-from schemas import Project, ProcessURLRequest, RegenerateRequest, ExportQuery
+from exporters import render_pdf, render_docx, warm_up
+from schemas import SECTIONS, ProcessURLRequest, RegenerateRequest, ExportQuery
+
+logger = logging.getLogger(__name__)
 
 # AI placeholders: we implement rule-based stub that can be upgraded to OpenAI later
 # To keep the app functional without external keys, we won't call real OpenAI here.
 # The extraction/generation functions are deterministic and fast.
 
-app = FastAPI(title="Auto-Explainer for Developers API")
+def _json_default(obj):
+    # orjson handles datetime natively; Mongo ObjectIds are sent as strings
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class APIJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes raw Mongo documents."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def ensure_indexes():
+    """Create the indexes the queries rely on; an unreachable database must not block boot."""
+    if db is None:
+        return
+    try:
+        # Backs the newest-first listing and its keyset pagination
+        db["project"].create_index([("updated_at", -1), ("_id", -1)])
+        # Backs the stale-render cleanup in store_cached_export (GridFS only indexes filename)
+        db["export.files"].create_index([("metadata.project_id", 1), ("metadata.format", 1)])
+    except Exception:
+        logger.exception("Could not create project indexes; see /test for database status")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """One-shot per-worker setup and teardown of shared resources."""
+    global http_client, export_executor
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    # Runs in the background so a slow server selection does not delay startup
+    app.state.index_task = asyncio.create_task(asyncio.to_thread(ensure_indexes))
+    http_client = httpx.AsyncClient(
+        timeout=10.0,
+        # requests followed redirects by default; http->https and www hops are common
+        follow_redirects=True,
+        max_redirects=5,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+    )
+    export_executor = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=export_mp_context())
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(export_executor, warm_up) for _ in range(EXPORT_WORKERS)])
+
+    yield
+
+    await http_client.aclose()
+    export_executor.shutdown(wait=False, cancel_futures=True)
+
+
+# The event loop is chosen by the server: uvicorn and its gunicorn worker use
+# uvloop automatically when it is installed (loop="auto"), so no policy is set here.
+app = FastAPI(title="Auto-Explainer for Developers API", default_response_class=APIJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,20 +97,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-SECTIONS = [
-    "instagram_post",
-    "facebook_post",
-    "reels_script",
-    "selling_points",
-    "whatsapp_short",
-    "qa",
-    "sales_call_script",
-]
-
 LANGS = ["en", "pl"]
 
+# Lightweight listing: metadata only, newest first
+PROJECT_LIST_FIELDS = {"title": 1, "source_type": 1, "tone": 1, "updated_at": 1}
+PROJECT_LIST_SORT = [("updated_at", -1), ("_id", -1)]
+
+# Aggregation stages that expose _id as a string "id", so Mongo returns API-shaped documents
+ID_STRINGIFY = [{"$addFields": {"id": {"$toString": "$_id"}}}, {"$project": {"_id": 0}}]
+
 UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Only the start of a fetched page is used; refuse anything declaring more than this
+FETCH_TEXT_CHARS = 5000
+MAX_FETCH_BYTES = 10_000_000
+
+# Shared outbound HTTP client so keep-alive connections are reused across requests.
+# Created in lifespan so each server worker (see gunicorn_conf.py) owns its own pool.
+http_client: Optional[httpx.AsyncClient] = None
+
+
+# Rendering PDF/DOCX is CPU-bound; run it in worker processes off the event loop.
+# The CPUs are shared between all server workers, each of which starts its own pool.
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 0)) or max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", 1)))
+export_executor: Optional[ProcessPoolExecutor] = None
+
+
+def export_mp_context():
+    """Start pool processes clean instead of forking a threaded server worker.
+
+    Forking after pymongo and the threadpool have started threads risks deadlocks;
+    a forkserver that preloads only exporters keeps the pool free of the app.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["exporters"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+EXPORT_RENDERERS = {
+    "pdf": (render_pdf, "application/pdf"),
+    "docx": (render_docx, "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+}
+
+# Rendered exports are cached in GridFS per (project, updated_at, format)
+export_fs = gridfs.GridFS(db, collection="export") if db is not None else None
+
+
+# Keywords whose first occurrence starts a snippet in simple_extract
+SNIPPET_KEYS = ["location", "handover", "developer", "project"]
 
 
 def simple_extract(text: str) -> dict:
@@ -60,10 +166,10 @@ def simple_extract(text: str) -> dict:
         "project": "",
     }
 
-    # crude heuristics
-    for key in ["location", "handover", "developer", "project"]:
-        if key in lower:
-            start = lower.find(key)
+    # crude heuristics; str.find is a fast C search, one scan per snippet key
+    for key in SNIPPET_KEYS:
+        start = lower.find(key)
+        if start != -1:
             snippet = text[start:start+160]
             data[key] = snippet.split("\n")[0]
 
@@ -80,104 +186,146 @@ def simple_extract(text: str) -> dict:
     return data
 
 
+# Bump when the keywords or heuristics above change so cached results are not reused
+RULESET_VERSION = 1
+EXTRACT_CACHE_SIZE = 1024
+_extract_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+
+
+def cached_extract(text: str) -> dict:
+    """simple_extract memoized on the SHA-256 of the text (LRU, in-process).
+
+    Pays off for fetched pages (~5000 chars: a hit is 2-3x cheaper than extracting);
+    for short inputs such as a filename, hashing and copying cost more than extracting.
+    """
+    key = (RULESET_VERSION, hashlib.sha256(text.encode("utf-8")).digest())
+    data = _extract_cache.get(key)
+    if data is None:
+        data = simple_extract(text)
+        _extract_cache[key] = data
+        if len(_extract_cache) > EXTRACT_CACHE_SIZE:
+            _extract_cache.popitem(last=False)
+    else:
+        _extract_cache.move_to_end(key)
+    # Callers get their own copy so the cached entry cannot be mutated
+    return copy.deepcopy(data)
+
+
+QA_ITEMS = {
+    "en": [
+        "What is the starting price?",
+        "What sizes are available?",
+        "What is the payment plan?",
+        "Where is it located?",
+        "When is handover?",
+        "Who is the developer?",
+        "What amenities are included?",
+        "Expected ROI?",
+        "Is financing available?",
+        "How to reserve?",
+    ],
+    "pl": [
+        "Jaka jest cena startowa?",
+        "Jakie metraże są dostępne?",
+        "Jaki jest plan płatności?",
+        "Gdzie znajduje się inwestycja?",
+        "Kiedy odbiory?",
+        "Kto jest deweloperem?",
+        "Jakie udogodnienia?",
+        "Oczekiwany zwrot?",
+        "Czy dostępne jest finansowanie?",
+        "Jak zarezerwować?",
+    ],
+}
+
+# Q&A is tone-neutral and has no placeholders, so each language's block is a constant
+QA_BLOCKS = {lang: "\n".join(f"Q: {q}\nA: " for q in items) for lang, items in QA_ITEMS.items()}
+
+TONE_PREFIXES = {
+    "premium": {"en": "Premium: ", "pl": "Premium: "},
+    "aggressive": {"en": "ACT NOW: ", "pl": "DZIAŁAJ TERAZ: "},
+    "simple": {"en": "Plain: ", "pl": "Prosto: "},
+    "storytelling": {"en": "Imagine this: ", "pl": "Wyobraź sobie: "},
+}
+
+
+def _make_generator(prefix: str, lang: str):
+    """Specialize the section builder for one (tone, lang): prefix and Q&A are fixed."""
+    qa = QA_BLOCKS[lang]
+
+    if lang == "pl":
+        def generate(name, location, prices, sizes, payment, amenities, usp, handover, developer):
+            return {
+                "instagram_post": f"{prefix}{name} w {location}. {prices} {sizes} {payment} Udogodnienia: {amenities}. Handover: {handover}. Deweloper: {developer}.",
+                "facebook_post": f"{prefix}Poznaj {name}. Kluczowe atuty: {usp}. Ceny: {prices}. Metraże: {sizes}. Płatność: {payment}. Lokalizacja: {location}.",
+                "reels_script": f"{prefix}Hook: {name} w {location}.\n- {usp}\n- {prices}\n- {sizes}\n- {payment}\nCTA: Napisz po szczegóły.",
+                "selling_points": f"{prefix}Top 10: {usp}, Udogodnienia: {amenities}, Handover: {handover}, Deweloper: {developer}",
+                "whatsapp_short": f"{prefix}Krótko: {name} w {location}. {prices} {payment}",
+                "qa": qa,
+                "sales_call_script": f"{prefix}Intro: dzwonię w sprawie {name}. Potwierdź zainteresowanie, podaj {prices} i {payment}, umów prezentację.",
+            }
+    else:
+        def generate(name, location, prices, sizes, payment, amenities, usp, handover, developer):
+            return {
+                "instagram_post": f"{prefix}{name} in {location}. {prices} {sizes} {payment} Amenities: {amenities}. Handover: {handover}. By {developer}.",
+                "facebook_post": f"{prefix}Discover {name}. Key points: {usp}. Prices: {prices}. Sizes: {sizes}. Payment: {payment}. Location: {location}.",
+                "reels_script": f"{prefix}Hook: Own {name} in {location}.\n- {usp}\n- {prices}\n- {sizes}\n- {payment}\nCTA: DM for details.",
+                "selling_points": f"{prefix}Top 10: {usp}, Amenities: {amenities}, Handover: {handover}, Developer: {developer}",
+                "whatsapp_short": f"{prefix}Short: {name} in {location}. {prices} {payment}",
+                "qa": qa,
+                "sales_call_script": f"{prefix}Intro: calling about {name}. Confirm interest, share {prices} & {payment}, schedule viewing.",
+            }
+
+    return generate
+
+
+GENERATORS = {
+    (tone, lang): _make_generator(prefixes[lang], lang)
+    for tone, prefixes in TONE_PREFIXES.items()
+    for lang in LANGS
+}
+
+
 def generate_content(extracted: dict, tone: str, lang: str) -> dict:
     """Generate seven content formats in EN/PL with chosen tone.
     This is a lightweight template-based generator to keep app runnable.
     """
-    name = extracted.get("project") or "New Development"
-    location = extracted.get("location", "")
-    prices = extracted.get("prices", "")
-    sizes = extracted.get("sizes", "")
-    payment = extracted.get("payment_plan", "")
-    amenities = ", ".join(extracted.get("amenities", []))
-    usp = ", ".join(extracted.get("usp", []))
-    handover = extracted.get("handover", "")
-    developer = extracted.get("developer", "")
-
-    def t(en, pl):
-        return pl if lang == "pl" else en
-
-    def apply_tone(text):
-        if tone == "aggressive":
-            return t("ACT NOW: ", "DZIAŁAJ TERAZ: ") + text
-        if tone == "simple":
-            return t("Plain: ", "Prosto: ") + text
-        if tone == "storytelling":
-            return t("Imagine this: ", "Wyobraź sobie: ") + text
-        return t("Premium: ", "Premium: ") + text
-
-    instagram = apply_tone(
-        t(
-            f"{name} in {location}. {prices} {sizes} {payment} Amenities: {amenities}. Handover: {handover}. By {developer}.",
-            f"{name} w {location}. {prices} {sizes} {payment} Udogodnienia: {amenities}. Handover: {handover}. Deweloper: {developer}.",
-        )
+    # Unknown tones fall back to premium, unknown languages to English
+    generate = GENERATORS.get((tone, lang)) or GENERATORS[(tone if tone in TONE_PREFIXES else "premium", "pl" if lang == "pl" else "en")]
+    return generate(
+        extracted.get("project") or "New Development",
+        extracted.get("location", ""),
+        extracted.get("prices", ""),
+        extracted.get("sizes", ""),
+        extracted.get("payment_plan", ""),
+        ", ".join(extracted.get("amenities", [])),
+        ", ".join(extracted.get("usp", [])),
+        extracted.get("handover", ""),
+        extracted.get("developer", ""),
     )
 
-    facebook = apply_tone(
-        t(
-            f"Discover {name}. Key points: {usp}. Prices: {prices}. Sizes: {sizes}. Payment: {payment}. Location: {location}.",
-            f"Poznaj {name}. Kluczowe atuty: {usp}. Ceny: {prices}. Metraże: {sizes}. Płatność: {payment}. Lokalizacja: {location}.",
-        )
-    )
-
-    reels = apply_tone(
-        t(
-            f"Hook: Own {name} in {location}.\n- {usp}\n- {prices}\n- {sizes}\n- {payment}\nCTA: DM for details.",
-            f"Hook: {name} w {location}.\n- {usp}\n- {prices}\n- {sizes}\n- {payment}\nCTA: Napisz po szczegóły.",
-        )
-    )
 
-    selling_points = apply_tone(
-        t(
-            f"Top 10: {usp}, Amenities: {amenities}, Handover: {handover}, Developer: {developer}",
-            f"Top 10: {usp}, Udogodnienia: {amenities}, Handover: {handover}, Deweloper: {developer}",
-        )
-    )
+def build_outputs(extracted: dict, tone: str, languages: List[str]):
+    # Generation is pure CPU and takes microseconds; a thread fan-out only adds overhead
+    results = [generate_content(extracted, tone, lang) for lang in languages]
+    # Stored section-major: outputs[section][lang]
+    return {sec: {lang: content[sec] for lang, content in zip(languages, results)} for sec in SECTIONS}
 
-    whatsapp = apply_tone(
-        t(
-            f"Short: {name} in {location}. {prices} {payment}",
-            f"Krótko: {name} w {location}. {prices} {payment}",
-        )
-    )
 
-    qa_items = [
-        t("What is the starting price?", "Jaka jest cena startowa?"),
-        t("What sizes are available?", "Jakie metraże są dostępne?"),
-        t("What is the payment plan?", "Jaki jest plan płatności?"),
-        t("Where is it located?", "Gdzie znajduje się inwestycja?"),
-        t("When is handover?", "Kiedy odbiory?"),
-        t("Who is the developer?", "Kto jest deweloperem?"),
-        t("What amenities are included?", "Jakie udogodnienia?"),
-        t("Expected ROI?", "Oczekiwany zwrot?"),
-        t("Is financing available?", "Czy dostępne jest finansowanie?"),
-        t("How to reserve?", "Jak zarezerwować?"),
-    ]
-    qa = "\n".join([f"Q: {q}\nA: " for q in qa_items])
-
-    call_script = apply_tone(
-        t(
-            f"Intro: calling about {name}. Confirm interest, share {prices} & {payment}, schedule viewing.",
-            f"Intro: dzwonię w sprawie {name}. Potwierdź zainteresowanie, podaj {prices} i {payment}, umów prezentację.",
-        )
-    )
+def outputs_by_language(outputs: dict) -> dict:
+    """Regroup section-major outputs as outputs[lang][section] for per-language exports."""
+    by_lang = {}
+    for sec, langs in outputs.items():
+        for lang, val in langs.items():
+            by_lang.setdefault(lang, {})[sec] = val
+    return by_lang
 
-    return {
-        "instagram_post": instagram,
-        "facebook_post": facebook,
-        "reels_script": reels,
-        "selling_points": selling_points,
-        "whatsapp_short": whatsapp,
-        "qa": qa,
-        "sales_call_script": call_script,
-    }
 
-
-def build_outputs(extracted: dict, tone: str, languages: List[str]):
-    outputs = {}
-    for lang in languages:
-        outputs[lang] = generate_content(extracted, tone, lang)
-    return outputs
+def output_path(sec: str, lang: str) -> str:
+    """Dotted Mongo path for one generated output, rejecting keys that would alter the path."""
+    if sec not in SECTIONS or not lang or "." in lang or lang.startswith("$"):
+        raise HTTPException(status_code=400, detail=f"Invalid output key: {sec}.{lang}")
+    return f"outputs.{sec}.{lang}"
 
 
 @app.get("/")
@@ -185,32 +333,53 @@ def root():
     return {"message": "Auto-Explainer API running"}
 
 
+async def fetch_text(url: str) -> str:
+    """Fetch the first FETCH_TEXT_CHARS characters of a URL, closing the connection early."""
+    # UTF-8 needs at most 4 bytes per character
+    max_bytes = FETCH_TEXT_CHARS * 4
+    async with http_client.stream("GET", url) as r:
+        # Error pages would otherwise be extracted as if they were the listing
+        r.raise_for_status()
+        declared = r.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > MAX_FETCH_BYTES:
+            raise HTTPException(status_code=413, detail="Remote document too large")
+        buf = bytearray()
+        async for chunk in r.aiter_bytes(8192):
+            buf.extend(chunk)
+            if len(buf) >= max_bytes:
+                break
+    return bytes(buf[:max_bytes]).decode(r.encoding or "utf-8", "ignore")[:FETCH_TEXT_CHARS]
+
+
 @app.post("/api/process/url")
-def process_url(payload: ProcessURLRequest):
+async def process_url(payload: ProcessURLRequest):
     # Fetch text content from URL (basic). In production handle PDFs/HTML properly.
     try:
-        r = requests.get(payload.url, timeout=10)
-        content = r.text[:5000]
+        content = await fetch_text(payload.url)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch: {e}")
 
-    extracted = simple_extract(content)
+    extracted = cached_extract(content)
     outputs = build_outputs(extracted, payload.tone, payload.languages)
 
-    project = Project(
-        title=extracted.get("project") or payload.url,
-        source_type="url",
-        source_url=payload.url,
-        tone=payload.tone,
-        extracted=extracted,
-        outputs=outputs,
-    )
-    project_id = create_document("project", project)
-    return {"id": project_id, "project": project.model_dump()}
+    # Built in-process from validated inputs, so a plain dict in the Project shape is enough
+    project = {
+        "title": extracted.get("project") or payload.url,
+        "source_type": "url",
+        "source_url": payload.url,
+        "file_path": None,
+        "tone": payload.tone,
+        "extracted": extracted,
+        "outputs": outputs,
+    }
+    project_id = await asyncio.to_thread(create_document, "project", project)
+    return {"id": project_id, "project": project}
 
 
 @app.post("/api/process/upload")
-def process_upload(
+async def process_upload(
     file: UploadFile = File(...),
     tone: str = Form("premium"),
 ):
@@ -219,107 +388,196 @@ def process_upload(
     if ext not in [".pdf", ".png", ".jpg", ".jpeg"]:
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
-    saved = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}")
-    content = file.file.read()
-    with open(saved, "wb") as f:
-        f.write(content)
-
-    # Stub: we can't OCR here; use filename as source for heuristics
+    tmp_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}.part")
+    digest = blake3.blake3()
+    # Stream to disk in 1 MiB chunks so memory stays bounded regardless of file size,
+    # hashing along the way for content-addressed storage
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        # Client disconnects (cancellation included) or write errors must not leave partial files
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    saved = os.path.join(UPLOAD_DIR, f"{digest.hexdigest()}{ext}")
+    if os.path.exists(saved):
+        # Identical file already stored
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, saved)
+
+    # Stub: we can't OCR here; use filename as source for heuristics.
+    # Once extraction reads the file bytes, it can be reused per digest.
     text_hint = file.filename
     extracted = simple_extract(text_hint)
     outputs = build_outputs(extracted, tone, LANGS)
 
-    project = Project(
-        title=extracted.get("project") or os.path.basename(file.filename),
-        source_type="upload",
-        file_path=saved,
-        tone=tone,
-        extracted=extracted,
-        outputs=outputs,
-    )
-    project_id = create_document("project", project)
-    return {"id": project_id, "project": project.model_dump()}
+    project = {
+        "title": extracted.get("project") or os.path.basename(file.filename),
+        "source_type": "upload",
+        "source_url": None,
+        "file_path": saved,
+        "tone": tone,
+        "extracted": extracted,
+        "outputs": outputs,
+    }
+    project_id = await asyncio.to_thread(create_document, "project", project)
+    return {"id": project_id, "project": project}
 
 
 @app.get("/api/projects")
-def list_projects(limit: int = 50):
-    docs = get_documents("project", {}, limit)
-    # convert ObjectId to string if present
-    for d in docs:
-        if "_id" in d:
-            d["id"] = str(d.pop("_id"))
+def list_projects(limit: int = 50, after: Optional[str] = None):
+    filter_dict = {}
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid 'after' project id")
+        # Keyset pagination: continue strictly after the given project in (updated_at, _id) order
+        last = db["project"].find_one({"_id": ObjectId(after)}, {"updated_at": 1})
+        if not last:
+            raise HTTPException(status_code=404, detail="Not found")
+        filter_dict = {"$or": [
+            {"updated_at": {"$lt": last.get("updated_at")}},
+            {"updated_at": last.get("updated_at"), "_id": {"$lt": last["_id"]}},
+        ]}
+    docs = get_documents("project", filter_dict, limit, projection=PROJECT_LIST_FIELDS, sort=PROJECT_LIST_SORT, stages=ID_STRINGIFY)
     return {"projects": docs}
 
 
+# Absorbs bursty polling of a project while it is being edited
+project_cache = TTLCache(maxsize=1024, ttl=2)
+project_cache_lock = threading.Lock()
+
+
+@cached(project_cache, key=lambda project_id: project_id, lock=project_cache_lock)
+def load_project(project_id: str) -> Optional[dict]:
+    cursor = db["project"].aggregate([{"$match": {"_id": ObjectId(project_id)}}, {"$limit": 1}, *ID_STRINGIFY])
+    return next(cursor, None)
+
+
+def invalidate_project(project_id: str):
+    with project_cache_lock:
+        project_cache.pop(project_id, None)
+
+
+def project_etag(doc: dict) -> str:
+    return '"' + hashlib.md5(str(doc.get("updated_at")).encode("utf-8")).hexdigest() + '"'
+
+
 @app.get("/api/projects/{project_id}")
-def get_project(project_id: str):
-    from bson import ObjectId
-    doc = db["project"].find_one({"_id": ObjectId(project_id)})
+def get_project(project_id: str, request: Request, response: Response):
+    doc = load_project(project_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Not found")
-    doc["id"] = str(doc.pop("_id"))
+
+    # Conditional GET: clients revalidate and get an empty 304 while unchanged
+    etag = project_etag(doc)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return {"project": doc}
 
 
 class OutputsPayload(BaseModel):
+    # Sparse edit: only the changed fields, outputs[section][lang] -> str
     outputs: Dict[str, Dict[str, str]]
 
 
 @app.post("/api/projects/{project_id}/update_outputs")
 def update_outputs(project_id: str, payload: OutputsPayload):
-    from bson import ObjectId
-    result = db["project"].update_one({"_id": ObjectId(project_id)}, {"$set": {"outputs": payload.outputs, "updated_at": datetime.utcnow()}})
+    # Set only the edited fields so unchanged sections are not rewritten
+    update = {}
+    for sec, langs in payload.outputs.items():
+        for lang, val in langs.items():
+            update[output_path(sec, lang)] = val
+    update["updated_at"] = datetime.now(timezone.utc)
+    result = db["project"].update_one({"_id": ObjectId(project_id)}, {"$set": update})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Not found")
+    invalidate_project(project_id)
     return {"status": "ok"}
 
 
 @app.post("/api/projects/{project_id}/regenerate")
-def regenerate(project_id: str, payload: RegenerateRequest):
-    from bson import ObjectId
-    doc = db["project"].find_one({"_id": ObjectId(project_id)})
+async def regenerate(project_id: str, payload: RegenerateRequest):
+    oid = ObjectId(project_id)
+    # Only the extracted facts are needed; skip transferring the existing outputs
+    doc = await asyncio.to_thread(db["project"].find_one, {"_id": oid}, {"extracted": 1})
     if not doc:
         raise HTTPException(status_code=404, detail="Not found")
 
     outputs = build_outputs(doc.get("extracted", {}), payload.tone, payload.languages)
-    db["project"].update_one({"_id": ObjectId(project_id)}, {"$set": {"tone": payload.tone, "outputs": outputs, "updated_at": datetime.utcnow()}})
+    # Replace all outputs so every stored language matches the document-level tone
+    await asyncio.to_thread(
+        db["project"].update_one,
+        {"_id": oid},
+        {"$set": {"tone": payload.tone, "outputs": outputs, "updated_at": datetime.now(timezone.utc)}},
+    )
+    invalidate_project(project_id)
 
     return {"status": "ok"}
 
 
+# Bump when the renderers change output so cached renders are not served again
+EXPORT_RENDER_VERSION = 2
+
+
+def _export_key(project_id: str, doc: dict, fmt: str) -> str:
+    return f"{project_id}/{doc.get('updated_at')}/{fmt}/v{EXPORT_RENDER_VERSION}"
+
+
+def load_cached_export(project_id: str, doc: dict, fmt: str) -> Optional[bytes]:
+    if export_fs is None:
+        return None
+    cached = export_fs.find_one({"filename": _export_key(project_id, doc, fmt)})
+    return cached.read() if cached else None
+
+
+def store_cached_export(project_id: str, doc: dict, fmt: str, data: bytes):
+    if export_fs is None:
+        return
+    # Drop renders of older versions of this project before storing the new one
+    for stale in export_fs.find({"metadata.project_id": project_id, "metadata.format": fmt}):
+        export_fs.delete(stale._id)
+    export_fs.put(data, filename=_export_key(project_id, doc, fmt), metadata={"project_id": project_id, "format": fmt})
+
+
 @app.post("/api/projects/{project_id}/export")
-def export(project_id: str, query: ExportQuery):
-    from bson import ObjectId
-    doc = db["project"].find_one({"_id": ObjectId(project_id)})
+async def export(project_id: str, query: ExportQuery):
+    doc = await asyncio.to_thread(db["project"].find_one, {"_id": ObjectId(project_id)})
     if not doc:
         raise HTTPException(status_code=404, detail="Not found")
 
     fmt = query.format.lower()
 
-    # Build a unified text for txt/pdf/docx; and JSON for json
+    # JSON returns the document; txt is streamed; pdf/docx are rendered in the process pool
     if fmt == "json":
-        return JSONResponse(doc)
+        return APIJSONResponse(doc)
+
+    if fmt in EXPORT_RENDERERS:
+        renderer, media_type = EXPORT_RENDERERS[fmt]
+        data = await asyncio.to_thread(load_cached_export, project_id, doc, fmt)
+        if data is None:
+            payload = {"title": doc.get("title", ""), "outputs": outputs_by_language(doc.get("outputs") or {})}
+            data = await asyncio.get_running_loop().run_in_executor(export_executor, renderer, payload)
+            await asyncio.to_thread(store_cached_export, project_id, doc, fmt, data)
+        return Response(data, media_type=media_type, headers={"Content-Disposition": f"attachment; filename=export.{fmt}"})
 
     def combined_text():
-        lines = []
-        lines.append(f"Title: {doc.get('title','')}")
-        for lang, sections in (doc.get("outputs") or {}).items():
-            lines.append(f"\n=== {lang.upper()} ===")
+        # Yield the export piece by piece so it is never held in memory as a whole
+        yield f"Title: {doc.get('title','')}".encode("utf-8")
+        for lang, sections in outputs_by_language(doc.get("outputs") or {}).items():
+            yield f"\n\n=== {lang.upper()} ===".encode("utf-8")
             for sec, val in sections.items():
-                lines.append(f"\n## {sec}\n{val}")
-        return "\n".join(lines)
-
-    text_data = combined_text()
+                yield f"\n\n## {sec}\n{val}".encode("utf-8")
 
     if fmt == "txt":
-        return StreamingResponse(io.BytesIO(text_data.encode("utf-8")), media_type="text/plain", headers={"Content-Disposition": "attachment; filename=export.txt"})
-
-    if fmt == "pdf":
-        # Minimal PDF using reportlab would require dependency; use txt fallback in a PDF MIME
-        return StreamingResponse(io.BytesIO(text_data.encode("utf-8")), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=export.pdf"})
-
-    if fmt == "docx":
-        return StreamingResponse(io.BytesIO(text_data.encode("utf-8")), media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document", headers={"Content-Disposition": "attachment; filename=export.docx"})
+        return StreamingResponse(combined_text(), media_type="text/plain", headers={"Content-Disposition": "attachment; filename=export.txt"})
 
     raise HTTPException(status_code=400, detail="Unsupported export format")
 
@@ -359,6 +617,5 @@ def test_database():
 
 
 if __name__ == "__main__":
-    import uvicorn
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Multi-process server: one uvicorn worker per core, app preloaded (see gunicorn_conf.py)
+    os.execvp("gunicorn", ["gunicorn", "-c", "gunicorn_conf.py", "main:app"])
@@ -0,0 +1,63 @@
+"""
+One-shot migration: outputs[lang][section] -> outputs[section][lang]
+
+Rewrites existing project documents to the section-major outputs layout.
+Language keys are swapped per key and merged into any section keys already on the
+document; fully migrated documents are left alone, so it is safe to re-run.
+
+    python migrate_outputs.py
+"""
+
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from database import db
+from schemas import SECTIONS
+
+
+def migrate_outputs(outputs: dict) -> dict:
+    """Swap language keys into section-major form, keeping any section keys already present.
+
+    A document edited or regenerated between deploy and migration can hold both
+    old language keys and new section keys; the section keys are newer and win.
+    """
+    migrated = {}
+    for lang, sections in outputs.items():
+        if lang in SECTIONS:
+            continue
+        for sec, val in sections.items():
+            migrated.setdefault(sec, {})[lang] = val
+    for sec, langs in outputs.items():
+        if sec in SECTIONS:
+            migrated.setdefault(sec, {}).update(langs)
+    return migrated
+
+
+def needs_migration(outputs: dict) -> bool:
+    return any(key not in SECTIONS for key in outputs)
+
+
+def migrate(batch_size: int = 500) -> int:
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    migrated = 0
+    batch = []
+    for doc in db["project"].find({}, {"outputs": 1}):
+        outputs = doc.get("outputs") or {}
+        if not needs_migration(outputs):
+            continue
+        # Bump updated_at: the project ETag and the cached export renders are keyed on it
+        update = {"outputs": migrate_outputs(outputs), "updated_at": datetime.now(timezone.utc)}
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(batch) >= batch_size:
+            migrated += db["project"].bulk_write(batch).modified_count
+            batch = []
+    if batch:
+        migrated += db["project"].bulk_write(batch).modified_count
+    return migrated
+
+
+if __name__ == "__main__":
+    print(f"Migrated {migrate()} project(s)")
@@ -6,8 +6,23 @@ Each Pydantic model maps to a MongoDB collection with the lowercase class name.
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
+# Generated content sections, the first-level keys of Project.outputs
+SECTIONS = [
+    "instagram_post",
+    "facebook_post",
+    "reels_script",
+    "selling_points",
+    "whatsapp_short",
+    "qa",
+    "sales_call_script",
+]
+
 class Project(BaseModel):
-    """Represents one processed property development launch."""
+    """Represents one processed property development launch.
+
+    The create endpoints in main.py insert this shape as a plain dict without
+    instantiating the model; keep the field set and order in sync with them.
+    """
     title: Optional[str] = Field(None, description="Detected project title/name")
     source_type: str = Field(..., description="'upload' or 'url'")
     source_url: Optional[str] = Field(None, description="If provided, the URL that was processed")
@@ -17,8 +32,8 @@ class Project(BaseModel):
     # Extracted raw facts from materials
     extracted: Dict[str, Any] = Field(default_factory=dict, description="Structured details: prices, sizes, payment_plan, location, amenities, usp, handover, developer")
 
-    # Generated outputs by language and section
-    # outputs[lang][section] -> str
+    # Generated outputs by section and language (section-major)
+    # outputs[section][lang] -> str
     outputs: Dict[str, Dict[str, str]] = Field(default_factory=dict)
 
 class RegenerateRequest(BaseModel):